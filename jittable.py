@@ -0,0 +1,12 @@
+"""Marker for test functions that may be compiled with numba (see main._maybe_jit)."""
+
+
+def jittable(func):
+    """Mark a test function for numba.njit compilation when numba is installed.
+
+    numba compiles int arguments and results as 64-bit integers, which wrap
+    around instead of growing like Python ints; only mark functions whose
+    values stay in that range.
+    """
+    func.__jittable__ = True
+    return func
@@ -1,17 +1,33 @@
 import sys
 import os
-import importlib.util
+import ast
+import functools
+import re
+import importlib
+import inspect
+import logging
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QTreeWidget, QTreeWidgetItem, 
                              QListWidget, QListWidgetItem, QSplitter, QVBoxLayout, 
-                             QWidget, QPushButton, QFileDialog, QTextEdit, QHBoxLayout,
+                             QWidget, QPushButton, QFileDialog, QPlainTextEdit, QHBoxLayout,
                              QMessageBox, QAbstractItemView, QMenu, QLabel, QLineEdit)
-from PyQt6.QtCore import Qt, QMimeData, QDataStream, QIODevice, pyqtSignal, QByteArray, QPoint
+from PyQt6.QtCore import Qt, QMimeData, QObject, QSignalBlocker, QThread, QThreadPool, QTimer, pyqtSignal, pyqtSlot, QByteArray
 from PyQt6.QtGui import QDrag, QIcon, QPixmap, QPainter, QColor
 import uuid
 
+log = logging.getLogger(__name__)
+
+try:
+    import numba
+except ImportError:  # 可选依赖：未安装时测试函数按普通 Python 执行
+    numba = None
+
 # 定义MIME类型
 MIME_TYPE = "application/x-test-item"
 
+# 执行计划中的操作码（见 MainWindow._build_plan）
+OP_CALL, OP_IF, OP_FOR, OP_BREAK, OP_END, OP_SKIP = range(6)
+CONTROL_OPS = {'if': OP_IF, 'for': OP_FOR, 'break': OP_BREAK, 'end': OP_END}
+
 
 class BreakLoop(Exception):
     """Internal exception to signal breaking out of the nearest enclosing for-loop.
@@ -25,6 +41,10 @@ class BreakLoop(Exception):
         self.runtime_vars = runtime_vars
 
 
+class RunCancelled(Exception):
+    """Raised by SequenceRunner between steps once cancel() has been called."""
+
+
 class StepObject:
     """Represent a step in the sequence. Holds parameters as attributes so each
     dropped item owns its own param state.
@@ -34,7 +54,11 @@ class StepObject:
         module: module name (for functions)
         control: control token (for control items)
         params: dict of parameter name -> string value
+        func: callable resolved when the step is dropped (function steps only)
     """
+    # 序列中可能有大量步骤，使用 __slots__ 省去每个实例的 __dict__
+    __slots__ = ('id', 'type', 'module', 'function', 'control', 'params', 'outputs', 'func')
+
     def __init__(self, type_, module=None, function=None, control=None):
         self.id = str(uuid.uuid4())
         self.type = type_
@@ -43,25 +67,468 @@ class StepObject:
         self.control = control
         self.params = {}
         self.outputs = {}
+        self.func = None
+
+    def __getstate__(self):
+        # 列表内拖拽移动时 Qt 会序列化项数据；函数引用不参与序列化，
+        # 由 DroppableListWidget / rebind_step_functions 重新解析
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state['func'] = None
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+def _safe_eval(expr, local_vars=None):
+    """Evaluate expr as a Python literal, falling back to a restricted eval.
+
+    Returns False if the expression cannot be evaluated.
+    """
+    if local_vars is None:
+        local_vars = {}
+    try:
+        return ast.literal_eval(expr)
+    except Exception:
+        try:
+            safe_globals = {"__builtins__": None, 'True': True, 'False': False, 'None': None}
+            return eval(expr, safe_globals, local_vars)
+        except Exception:
+            return False
+
+
+def _resolve_references(text, step_value, runtime_vars):
+    """Resolve ${#N:key} and ${@var} references in text.
+
+    Args:
+        text: raw parameter value; non-strings are returned unchanged
+        step_value: callable (index, key) -> str giving the value of key on the
+            0-based step index
+        runtime_vars: dict of runtime variables (e.g. loop vars)
+    """
+    if not isinstance(text, str):
+        return text
+
+    # replace ${#N:key}
+    text = re.sub(r"\$\{#(\d+):([^}]+)\}", lambda m: step_value(int(m.group(1)) - 1, m.group(2)), text)
+    # replace ${@var}
+    text = re.sub(r"\$\{@([^}]+)\}", lambda m: str(runtime_vars.get(m.group(1), "")), text)
+
+    # Try to interpret as literal (number, list) if possible
+    try:
+        return ast.literal_eval(text)
+    except Exception:
+        return text
+
+
+def _to_bool(value):
+    return value if isinstance(value, bool) else str(value).lower() in ('true', '1', 'yes', 'on')
+
+
+def _no_convert(value):
+    return value
+
+
+# 参数注解 -> 类型转换函数；其他注解（包括无注解）的值原样传递
+_CONVERTERS = {bool: _to_bool, int: int, float: float}
+
+
+# 可在一次运行的所有调用间共享的预转换参数值类型（不可变标量）
+_SHARED_ARG_TYPES = (int, float, bool, str, bytes, type(None))
+
+
+def _converter_for(annotation):
+    """Return the converter for a parameter annotation, see _CONVERTERS."""
+    try:
+        return _CONVERTERS.get(annotation, _no_convert)
+    except TypeError:
+        # unhashable annotation
+        return _no_convert
+
+
+class _JitFunction:
+    """Call a test function through numba.njit, falling back to plain Python per call.
+
+    The function is compiled lazily on first call. If numba cannot compile a
+    call (NumbaError raised before any user code runs), that call runs the
+    original function and the argument types are remembered, so later calls
+    with the same types skip the compile attempt. The original signature is
+    exposed through __signature__.
+    """
+    __slots__ = ('func', 'jitted', 'failed_types', '__signature__')
+
+    def __init__(self, func):
+        self.func = func
+        self.jitted = numba.njit(cache=True)(func)
+        # numba 不缓存失败的类型推断，这里记录失败的参数类型组合，避免每次调用都重新推断
+        self.failed_types = set()
+        self.__signature__ = inspect.signature(func)
+
+    def __call__(self, *args, **kwargs):
+        try:
+            key = (tuple(numba.typeof(v) for v in args),
+                   tuple((k, numba.typeof(v)) for k, v in sorted(kwargs.items())))
+        except Exception:
+            # numba has no type for some argument, so it cannot compile this call
+            return self.func(*args, **kwargs)
+        if key in self.failed_types:
+            return self.func(*args, **kwargs)
+        try:
+            return self.jitted(*args, **kwargs)
+        except numba.core.errors.NumbaError:
+            self.failed_types.add(key)
+            return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<numba-compiled {self.func.__module__}.{self.func.__qualname__}>"
+
+
+def _maybe_jit(func):
+    """Return a _JitFunction for test functions marked with @jittable when numba is installed, else func."""
+    if numba is None or not getattr(func, '__jittable__', False):
+        return func
+    try:
+        return _JitFunction(func)
+    except Exception:
+        return func
+
+
+def _is_module_file(module, path):
+    """Return True if module was loaded from the source file at path."""
+    module_file = getattr(module, '__file__', None)
+    if not module_file:
+        return False
+    return os.path.normcase(os.path.abspath(module_file)) == os.path.normcase(os.path.abspath(path))
+
+
+def _find_test_files(base_dir):
+    """Return (path, mtime_ns) of all test_*.py files in base_dir.
+
+    The directory is put on sys.path so the modules can be loaded with
+    importlib.import_module (see _load_test_module).
+    """
+    # 通过标准导入机制加载测试模块，以复用 sys.modules 和 __pycache__ 中的字节码
+    if base_dir not in sys.path:
+        sys.path.insert(0, base_dir)
+    # 让导入系统重新扫描目录，以便发现上次加载后新建的测试文件。
+    # 只刷新该目录的 finder，sys.path 上其他目录的缓存保持有效
+    finder = sys.path_importer_cache.get(base_dir)
+    if finder is not None:
+        finder.invalidate_caches()
+    files = []
+    with os.scandir(base_dir) as entries:
+        for entry in entries:
+            if not (entry.name.startswith('test_') and entry.name.endswith('.py')
+                    and entry.name != 'test_functions.py' and entry.is_file()):
+                continue
+            # mtime 取自扫描时的 DirEntry（其 stat 结果会被缓存），加载时不再单独 os.stat
+            try:
+                files.append((entry.path, entry.stat().st_mtime_ns))
+            except OSError:
+                # 扫描期间被删除
+                continue
+    return files
+
+
+@functools.lru_cache(maxsize=256)
+def _load_test_module(file_path, mtime_ns):
+    """Import a test file and collect its test functions.
+
+    Results are cached per (file_path, mtime_ns), so reloading an unchanged
+    file is a dict lookup. The returned dicts are shared and must not be mutated.
+
+    Returns:
+        (module_name, functions, func_returns) where functions maps the names of
+        the public functions defined in the module to the functions (numba
+        compiled if marked with @jittable, see _maybe_jit), and
+        func_returns maps function name to the return names parsed from the source.
+    """
+    module_name = os.path.splitext(os.path.basename(file_path))[0]
+    # 首次加载或文件已修改：丢弃旧模块后重新导入，得到不含已删除函数的全新命名空间
+    if _is_module_file(sys.modules.get(module_name), file_path):
+        del sys.modules[module_name]
+    module = importlib.import_module(module_name)
+    if not _is_module_file(module, file_path):
+        raise ImportError(f"模块名与已有模块冲突: {module.__file__}")
+    # attempt to parse source to find return variable names or dict keys
+    func_returns = {}
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            src = f.read()
+        tree = ast.parse(src)
+        for node in tree.body:
+            # 私有函数不会出现在函数树中，无需解析其返回值
+            if isinstance(node, ast.FunctionDef) and not node.name.startswith("_"):
+                ret_names = []
+                for st in ast.walk(node):
+                    if isinstance(st, ast.Return) and st.value is not None:
+                        v = st.value
+                        # return of a simple name: return sum
+                        if isinstance(v, ast.Name):
+                            ret_names.append(v.id)
+                        # return of a dict literal: return {'k': val}
+                        elif isinstance(v, ast.Dict):
+                            for key in v.keys:
+                                if isinstance(key, ast.Constant):
+                                    ret_names.append(str(key.value))
+                if ret_names:
+                    func_returns[node.name] = list(dict.fromkeys(ret_names))
+    except Exception:
+        # ignore parsing errors
+        pass
+
+    # 获取模块中定义的函数（忽略从其他模块导入的函数）
+    functions = {name: _maybe_jit(obj) for name, obj in module.__dict__.items()
+                 if not name.startswith("_") and inspect.isfunction(obj)
+                 and obj.__module__ == module.__name__}
+    return (module_name, functions, func_returns)
+
+
+class ModuleLoader(QObject):
+    """Import test files in a worker thread (used for the initial load at startup).
+
+    Args:
+        files: list of (path, mtime_ns), see _find_test_files
+    """
+    moduleLoaded = pyqtSignal(str, object, object)   # module_name, functions, func_returns
+    loadFailed = pyqtSignal(str, str)                # file_path, error message
+    finished = pyqtSignal()
+
+    def __init__(self, files):
+        super().__init__()
+        self.files = files
+
+    @pyqtSlot()
+    def run(self):
+        for file_path, mtime_ns in self.files:
+            try:
+                loaded = _load_test_module(file_path, mtime_ns)
+            except Exception as e:
+                self.loadFailed.emit(file_path, str(e))
+                continue
+            self.moduleLoaded.emit(*loaded)
+        self.finished.emit()
+
+
+class SequenceRunner(QObject):
+    """Run a snapshot of the test sequence on a QThreadPool worker.
+
+    The runner only works on plain Python data taken from the sequence list on
+    the GUI thread; output lines, step results and runtime variables are sent
+    back through signals so no widget is touched from the worker.
+
+    Args:
+        plan: compiled sequence, see MainWindow._build_plan
+    """
+    progress = pyqtSignal(str)
+    step_finished = pyqtSignal(int, bool)
+    vars_changed = pyqtSignal(dict)
+    finished = pyqtSignal()
+
+    def __init__(self, plan):
+        super().__init__()
+        self.plan = plan
+        # 由界面线程设置（如关闭窗口时），工作线程在每一步之前检查
+        self.cancelled = False
+        # matching 'end' index of every if/for header, resolved once up front
+        self.ends = {}
+        open_blocks = []
+        for i, entry in enumerate(plan):
+            op = entry[0]
+            if op == OP_IF or op == OP_FOR:
+                open_blocks.append(i)
+            elif op == OP_END and open_blocks:
+                self.ends[open_blocks.pop()] = i
+
+    def _step_value(self, idx, key):
+        if 0 <= idx < len(self.plan):
+            step_data, params = self.plan[idx][1:3]
+            # prefer outputs then params
+            if key in step_data.outputs:
+                return str(step_data.outputs.get(key))
+            return str(params.get(key, ""))
+        return ""
+
+    def _resolve(self, text, runtime_vars):
+        return _resolve_references(text, self._step_value, runtime_vars)
+
+    def cancel(self):
+        """Ask the runner to stop before its next step; a step already running is not interrupted."""
+        self.cancelled = True
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            self._run_block(0, len(self.plan) - 1, {})
+            self.progress.emit("测试序列执行完成。")
+        except RunCancelled:
+            self.progress.emit("测试序列已取消。")
+        except BreakLoop:
+            # break outside of any for-block: ignore and finish run
+            self.progress.emit("遇到 break（未在循环内），已忽略。")
+        except Exception as e:
+            self.progress.emit(f"执行过程中发生错误: {str(e)}")
+        finally:
+            self.finished.emit()
+
+    def _run_block(self, start_idx, end_idx, runtime_vars):
+        """Execute steps start_idx..end_idx inclusive using runtime_vars for ${@var} replacements."""
+        self.vars_changed.emit(dict(runtime_vars))
+        plan = self.plan
+        handlers = self._handlers
+        i = start_idx
+        while i <= end_idx:
+            if self.cancelled:
+                raise RunCancelled()
+            entry = plan[i]
+            # 按操作码索引处理函数表，每个处理函数返回下一步的下标
+            i = handlers[entry[0]](self, i, entry, runtime_vars)
+
+    def _exec_if(self, i, entry, runtime_vars):
+        params_src = entry[2]
+        match = self.ends.get(i, -1)
+        cond_raw = params_src.get('condition', '')
+        cond_val = self._resolve(cond_raw, runtime_vars)
+        cond_bool = cond_val if isinstance(cond_val, bool) else _safe_eval(str(cond_val), runtime_vars)
+        self.progress.emit(f"IF condition ({cond_raw}) -> {cond_bool}")
+        self.vars_changed.emit(dict(runtime_vars))
+        if cond_bool:
+            # execute block inside
+            if match != -1 and match > i:
+                self._run_block(i+1, match-1, runtime_vars)
+                return match + 1
+            return i + 1
+        # skip to end
+        return match + 1 if match != -1 else i + 1
+
+    def _exec_for(self, i, entry, runtime_vars):
+        params_src = entry[2]
+        match = self.ends.get(i, -1)
+        iterable_raw = params_src.get('iterable', '')
+        varname = params_src.get('var', '_loop')
+        iterable_val = self._resolve(iterable_raw, runtime_vars)
+        # normalize iterable
+        if isinstance(iterable_val, int):
+            iterator = range(iterable_val)
+        elif isinstance(iterable_val, (list, tuple)):
+            iterator = iterable_val
+        else:
+            # try to eval as python expression
+            try:
+                iterator = list(_safe_eval(str(iterable_val), runtime_vars))
+            except Exception:
+                iterator = []
+
+        self.progress.emit(f"FOR over {iterable_raw} -> {list(iterator)}")
+        self.vars_changed.emit(dict(runtime_vars))
+        if match != -1 and match > i:
+            for val in iterator:
+                new_vars = dict(runtime_vars)
+                new_vars[varname] = val
+                try:
+                    self._run_block(i+1, match-1, new_vars)
+                except BreakLoop:
+                    # break out of the iterator loop and continue after the matching end
+                    break
+            return match + 1
+        return i + 1
+
+    def _exec_break(self, i, entry, runtime_vars):
+        # stop the innermost for loop
+        self.progress.emit("BREAK")
+        self.vars_changed.emit(dict(runtime_vars))
+        raise BreakLoop(actions=1, runtime_vars=runtime_vars)
+
+    def _exec_end(self, i, entry, runtime_vars):
+        # should be handled by the matching-end lookup; just advance
+        return i + 1
+
+    def _exec_skip(self, i, entry, runtime_vars):
+        self.progress.emit(f"跳过未知步骤或控制: {entry[4]}")
+        self.vars_changed.emit(dict(runtime_vars))
+        return i + 1
+
+    def _exec_call(self, i, entry, runtime_vars):
+        _, step_data, _, func, name, preds, arg_specs = entry
+        self.progress.emit(f"执行: {name}...")
+
+        args = {}
+        for param_name, convert, value, deferred in arg_specs:
+            if deferred:
+                # only values with references are resolved and converted at run time
+                resolved = self._resolve(value, runtime_vars)
+                try:
+                    value = convert(resolved)
+                except Exception as e:
+                    self.progress.emit(f"参数 '{param_name}' 类型转换失败: {e}")
+                    value = resolved
+            args[param_name] = value
+
+        try:
+            result = func(**args)
+            # store outputs
+            if isinstance(result, dict):
+                step_data.outputs.update(result)
+            else:
+                step_data.outputs['return'] = result
+                try:
+                    for pn, pv in args.items():
+                        if pv == result:
+                            step_data.outputs[pn] = result
+                    # also map any predicted return names (parsed from source) to the returned value
+                    for pred in preds:
+                        if pred not in step_data.outputs:
+                            step_data.outputs[pred] = result
+                except Exception:
+                    pass
+            # determine success: None or truthy -> success
+            success = (result is None) or bool(result)
+            self.progress.emit(f"{'成功' if success else '失败'}")
+            self.step_finished.emit(i, success)
+        except Exception as e:
+            self.progress.emit(f"错误: {str(e)}")
+            self.step_finished.emit(i, False)
+
+        self.vars_changed.emit(dict(runtime_vars))
+        return i + 1
+
+    # 操作码 -> 处理函数，顺序与 OP_CALL..OP_SKIP 一致
+    _handlers = (_exec_call, _exec_if, _exec_for, _exec_break, _exec_end, _exec_skip)
 
 
 class DraggableTreeWidget(QTreeWidget):
     """可拖拽的函数列表"""
+    # 正在拖拽的 (模块名, 函数名)。拖放发生在同一进程内，MIME 数据只作类型标记，不做序列化
+    _pending_payload = None
+
     def __init__(self):
         super().__init__()
         self.setDragEnabled(True)
         self.setHeaderLabel("测试函数")
-        self.drag_start_position = QPoint(0, 0)
+        # 所有行都是单行文本，统一行高可避免布局时逐项查询 sizeHint
+        self.setUniformRowHeights(True)
+        # 拖拽起点（纯 Python 整数，鼠标移动时无需再经过 QPoint 访问）
+        self._drag_start_x = 0
+        self._drag_start_y = 0
+        # 拖拽阈值的平方，避免每次鼠标移动都查询 startDragDistance 并构造 QPoint
+        self._drag_threshold_sq = QApplication.startDragDistance() ** 2
         
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
-            self.drag_start_position = event.position().toPoint()
+            pos = event.position()
+            self._drag_start_x = int(pos.x())
+            self._drag_start_y = int(pos.y())
         super().mousePressEvent(event)
         
     def mouseMoveEvent(self, event):
-        if not (event.buttons() & Qt.MouseButton.LeftButton):
+        buttons = event.buttons()
+        if not (buttons & Qt.MouseButton.LeftButton):
             return
-        if (event.position().toPoint() - self.drag_start_position).manhattanLength() < QApplication.startDragDistance():
+        pos = event.position()
+        dx = int(pos.x()) - self._drag_start_x
+        dy = int(pos.y()) - self._drag_start_y
+        if dx * dx + dy * dy < self._drag_threshold_sq:
             return
             
         drag = QDrag(self)
@@ -70,46 +537,80 @@ class DraggableTreeWidget(QTreeWidget):
         # 获取当前选中项
         current_item = self.currentItem()
         if current_item and current_item.parent():  # 确保是函数而不是模块
-            # 创建自定义数据格式
-            item_data = QByteArray()
-            data_stream = QDataStream(item_data, QIODevice.OpenModeFlag.WriteOnly)
-            data_stream.writeString(current_item.text(0).encode('utf-8'))
-            data_stream.writeString(current_item.parent().text(0).encode('utf-8'))
-            
-            mime_data.setData(MIME_TYPE, item_data)
+            DraggableTreeWidget._pending_payload = (current_item.parent().text(0), current_item.text(0))
+            mime_data.setData(MIME_TYPE, QByteArray(b"1"))
             drag.setMimeData(mime_data)
             
             drag.exec(Qt.DropAction.CopyAction)
+            DraggableTreeWidget._pending_payload = None
 
 class DroppableListWidget(QListWidget):
-    """可接收拖拽的测试序列列表"""
+    """可接收拖拽的测试序列列表
+
+    Args:
+        test_functions: MainWindow.test_functions，用于在放下时解析函数引用
+    """
     itemMoved = pyqtSignal()
     
-    def __init__(self):
+    def __init__(self, test_functions):
         super().__init__()
+        self.test_functions = test_functions
         self.setAcceptDrops(True)
         self.setDragEnabled(True)
         self.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
         self.setDefaultDropAction(Qt.DropAction.MoveAction)
+        # 每个步骤都是单行文本加状态图标，统一尺寸后布局时不再逐项查询 sizeHint
+        self.setUniformItemSizes(True)
+        # 当前拖拽的数据类型，每次拖拽只在 dragEnterEvent 中判定一次（见 _drag_kind_of）
+        self._drag_kind = -1
+        # 序列在后台执行时为 True：拒绝放下和删除，避免列表变化清空已输出的运行结果
+        self.locked = False
+
+    @staticmethod
+    def _drag_kind_of(mime_data):
+        """0: 测试函数/流程控制项, 1: 纯文本控制语句, -1: 其他（如列表内部移动）"""
+        if mime_data.hasFormat(MIME_TYPE):
+            return 0
+        if mime_data.hasText():
+            return 1
+        return -1
     
     def dragEnterEvent(self, event):
-        if event.mimeData().hasFormat(MIME_TYPE) or event.mimeData().hasText():
+        if self.locked:
+            event.ignore()
+            return
+        self._drag_kind = self._drag_kind_of(event.mimeData())
+        if self._drag_kind >= 0:
             event.acceptProposedAction()
         else:
             super().dragEnterEvent(event)
             
     def dragMoveEvent(self, event):
-        if event.mimeData().hasFormat(MIME_TYPE) or event.mimeData().hasText():
+        if self.locked:
+            event.ignore()
+            return
+        if self._drag_kind >= 0:
             event.acceptProposedAction()
         else:
             super().dragMoveEvent(event)
+
+    def dragLeaveEvent(self, event):
+        self._drag_kind = -1
+        super().dragLeaveEvent(event)
             
     def dropEvent(self, event):
-        if event.mimeData().hasFormat(MIME_TYPE):
-            item_data = event.mimeData().data(MIME_TYPE)
-            data_stream = QDataStream(item_data, QIODevice.OpenModeFlag.ReadOnly)
-            func_name = bytes(data_stream.readString()).decode('utf-8')
-            module_name = bytes(data_stream.readString()).decode('utf-8')
+        if self.locked:
+            event.ignore()
+            return
+        kind = self._drag_kind_of(event.mimeData())
+        self._drag_kind = -1
+        if kind == 0:
+            payload = DraggableTreeWidget._pending_payload
+            if payload is None:
+                # 类型标记来自其他进程，没有可用的数据
+                event.ignore()
+                return
+            module_name, func_name = payload
             
             # If the item came from the special control category, create a control step
             if module_name == "流程控制":
@@ -118,25 +619,36 @@ class DroppableListWidget(QListWidget):
             else:
                 item = QListWidgetItem(f"{module_name}.{func_name}")
                 step = StepObject(type_="function", module=module_name, function=func_name)
+                step.func = self.test_functions.get((module_name, func_name))
             item.setData(Qt.ItemDataRole.UserRole, step)
-            item.setData(Qt.ItemDataRole.UserRole + 1, step.id)  # 唯一ID
-            self.addItem(item)
+            self._append_step(item)
             event.acceptProposedAction()
-        elif event.mimeData().hasText():
+        elif kind == 1:
             text = event.mimeData().text()
             if text in ["if", "for", "end", "break"]:
                 item = QListWidgetItem(text)
                 step = StepObject(type_="control", control=text)
                 item.setData(Qt.ItemDataRole.UserRole, step)
-                item.setData(Qt.ItemDataRole.UserRole + 1, step.id)  # 唯一ID
-                self.addItem(item)
+                self._append_step(item)
                 event.acceptProposedAction()
         else:
             super().dropEvent(event)
         self.itemMoved.emit()
 
+    def _append_step(self, item):
+        """Append a dropped step without emitting per-insert view signals."""
+        previous = self.currentItem()
+        with QSignalBlocker(self):
+            self.addItem(item)
+        current = self.currentItem()
+        if current is not previous:
+            # 向空列表添加时 Qt 会把新项设为当前项：补发一次，让参数面板与当前项保持一致
+            self.currentItemChanged.emit(current, previous)
+
     def keyPressEvent(self, event):
-        if event.key() == Qt.Key.Key_Delete and self.currentItem():
+        if event.key() == Qt.Key.Key_Delete and self.locked:
+            event.ignore()
+        elif event.key() == Qt.Key.Key_Delete and self.currentItem():
             row = self.currentRow()
             item = self.takeItem(row)
             del item
@@ -164,13 +676,29 @@ class ControlWidget(QWidget):
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.test_functions = {}
+        self.test_functions = {}         # key: (module, function), value: callable
+        self.signature_cache = {}        # key: (module, function), value: (signature, [(name, Parameter)], return annotation, [(name, converter)])
         self.current_param_widgets = {}  # 缓存当前参数控件
-        self.step_params_cache = {}      # 缓存每个步骤的参数值，key: "module.func", value: dict
+        self._row_pool = []              # 复用的参数输入行 (layout, label, edit, ref_btn)
+        self._active_rows = 0            # _row_pool 中当前显示的行数
+        self._edit_binding = {}          # 参数输入框 -> (QListWidgetItem, 参数名)，见 _on_any_param_changed
+        self._last_count = 0             # 输出区序列列表当前包含的项数
+        self._listing_revision = -1      # 写入序列列表后输出区文档的 revision，用于判断能否增量追加
+        self._runner = None              # 正在线程池中执行的 SequenceRunner
+        self._close_pending = False      # 运行中关闭了窗口：等待 runner 结束后再真正关闭
+        self._loader = None              # 启动时在后台加载测试模块的 ModuleLoader
+        self._load_thread = None         # 执行 ModuleLoader 的线程
+        self._pending_output = []        # 运行中尚未写入输出区的行
+        # 运行输出每 50 ms 合并写入一次，避免每行都触发一次文档布局和重绘
+        self._output_flush_timer = QTimer(self)
+        self._output_flush_timer.setSingleShot(True)
+        self._output_flush_timer.setInterval(50)
+        self._output_flush_timer.timeout.connect(self.flush_output)
         self.init_ui()
         # initialize pass/fail icons
         self.init_status_icons()
-        self.load_test_functions()
+        # 窗口显示后再在后台线程中加载测试模块
+        QTimer.singleShot(0, self.start_load_worker)
         self.create_menu_bar()  # 确保方法已定义
 
     def init_status_icons(self):
@@ -312,7 +840,7 @@ class MainWindow(QMainWindow):
         seq_layout.addLayout(control_bar)
 
         # 测试序列列表
-        self.sequence_list = DroppableListWidget()
+        self.sequence_list = DroppableListWidget(self.test_functions)
         seq_layout.addWidget(self.sequence_list)
 
         # --- 步骤设置区域 ---
@@ -343,8 +871,11 @@ class MainWindow(QMainWindow):
         seq_layout.addWidget(self.step_config_group)
 
         # 输出区域
-        self.output_text = QTextEdit()
+        self.output_text = QPlainTextEdit()
         self.output_text.setReadOnly(True)
+        # 只读日志不需要撤销栈；限制行数，长时间运行时内存占用有上限
+        self.output_text.setUndoRedoEnabled(False)
+        self.output_text.setMaximumBlockCount(10000)
         seq_layout.addWidget(self.output_text)
 
         seq_watcher_splitter.addWidget(seq_area)
@@ -399,51 +930,30 @@ class MainWindow(QMainWindow):
             self.output_params_label.setText("-")
             return
 
-        print(f"[DEBUG] 当前已选测试项: {current.text()}")
+        log.debug("当前已选测试项: %s", current.text())
         data = current.data(Qt.ItemDataRole.UserRole)
-        # 支持新的 StepObject 或旧的 dict（向后兼容）
-        if isinstance(data, StepObject):
-            item_id = data.id
-            print(f"[DEBUG] 当前项唯一ID: {item_id}")
-            print(f"[DEBUG] 当前项参数: {data.params}")
-            is_function = (data.type == "function")
-            module_name = data.module
-            func_name = data.function
-            func = self.test_functions.get(module_name, {}).get(func_name) if is_function else None
-        else:
-            item_id = current.data(Qt.ItemDataRole.UserRole + 1)
-            print(f"[DEBUG] 当前项唯一ID: {item_id}")
-            print(f"[DEBUG] 当前缓存内容: {list(self.step_params_cache.keys())}")
-            is_function = data.get("type") == "function"
-            module_name = data.get("module") if is_function else None
-            func_name = data.get("function") if is_function else None
-            func = self.test_functions.get(module_name, {}).get(func_name) if is_function else None
-
-        if is_function:
-            if func is None:
+        log.debug("当前项唯一ID: %s", data.id)
+        log.debug("当前项参数: %s", data.params)
+
+        if data.type == "function":
+            func = data.func
+            cached_sig = self.signature_cache.get((data.module, data.function))
+            if func is None or cached_sig is None:
                 self.add_input_row("error", "函数未找到", read_only=True)
                 return
 
-            import inspect
             try:
-                sig = inspect.signature(func)
-                params = list(sig.parameters.keys())
+                _, sig_params, return_annotation, _ = cached_sig
 
-                # 创建输入框，并填入该item专属的缓存值（从 StepObject.params 或旧缓存读取）
-                for param_name in params:
-                    if isinstance(data, StepObject):
-                        cached_value = data.params.get(param_name, "")
-                    else:
-                        cached_value = self.step_params_cache.get(item_id, {}).get(param_name, "")
-                    print(f"[DEBUG] 参数 '{param_name}' 的缓存值: '{cached_value}'")  # 调试
+                # 创建输入框，并填入该item专属的参数值（StepObject.params）
+                for param_name, _ in sig_params:
+                    cached_value = data.params.get(param_name, "")
+                    log.debug("参数 '%s' 的缓存值: '%s'", param_name, cached_value)
                     edit = self.add_input_row(param_name, cached_value)
-                    # 连接实时修改：当用户修改输入框时更新该项的 StepObject.params
-                    if isinstance(data, StepObject):
-                        # connect after creation
-                        edit.textChanged.connect(lambda val, it=current, p=param_name: self.on_param_changed(it, p, val))
+                    # 用户修改输入框时实时更新该项的 StepObject.params
+                    self._edit_binding[edit] = (current, param_name)
 
                 # 显示输出参数
-                return_annotation = sig.return_annotation
                 if return_annotation != inspect.Signature.empty:
                     if hasattr(return_annotation, '__name__'):
                         output_name = return_annotation.__name__
@@ -456,118 +966,177 @@ class MainWindow(QMainWindow):
                 self.add_input_row("error", f"解析失败: {str(e)}", read_only=True)
         else:
             # control item: show appropriate param inputs
-            if isinstance(data, StepObject):
-                control_type = data.control
-            else:
-                control_type = data.get("control")
+            control_type = data.control
 
             if control_type == "if":
                 # condition expression, can reference other steps via ${#N:key} or loop vars via ${@var}
-                cond = data.params.get("condition", "") if isinstance(data, StepObject) else self.step_params_cache.get(item_id, {}).get("condition", "")
-                edit = self.add_input_row("condition", cond)
-                if isinstance(data, StepObject):
-                    edit.textChanged.connect(lambda val, it=current: self.on_param_changed(it, "condition", val))
+                edit = self.add_input_row("condition", data.params.get("condition", ""))
+                self._edit_binding[edit] = (current, "condition")
             elif control_type == "for":
-                iterable = data.params.get("iterable", "") if isinstance(data, StepObject) else self.step_params_cache.get(item_id, {}).get("iterable", "")
-                varname = data.params.get("var", "_loop") if isinstance(data, StepObject) else self.step_params_cache.get(item_id, {}).get("var", "_loop")
-                edit1 = self.add_input_row("iterable", iterable)
-                edit2 = self.add_input_row("var", varname)
-                if isinstance(data, StepObject):
-                    edit1.textChanged.connect(lambda val, it=current: self.on_param_changed(it, "iterable", val))
-                    edit2.textChanged.connect(lambda val, it=current: self.on_param_changed(it, "var", val))
+                edit1 = self.add_input_row("iterable", data.params.get("iterable", ""))
+                edit2 = self.add_input_row("var", data.params.get("var", "_loop"))
+                self._edit_binding[edit1] = (current, "iterable")
+                self._edit_binding[edit2] = (current, "var")
             else:
                 # end or unknown control
                 self.output_params_label.setText("-")
 
+    @pyqtSlot()
     def load_test_functions(self):
         """加载当前目录下的测试函数"""
-        self.function_tree.clear()
-        self.test_functions = {}
+        if self._load_thread is not None or self._runner is not None:
+            # 启动时的后台加载尚未完成，或序列正在运行
+            return
+        # clear in place: the sequence list holds a reference to this dict
+        self.test_functions.clear()
+        self.signature_cache.clear()
         # reset parsed return names
         self.func_return_names = {}
-        
-        # 查找 Testcase/ 目录（优先），否则回退到当前目录
-        base_dir = os.path.join(os.getcwd(), 'Testcase') if os.path.isdir(os.path.join(os.getcwd(), 'Testcase')) else os.getcwd()
-        for fname in os.listdir(base_dir):
-            if fname.endswith('.py') and fname.startswith('test_') and fname != 'test_functions.py':
-                file_path = os.path.join(base_dir, fname)
-                module_name = os.path.splitext(os.path.basename(file_path))[0]
-                try:
-                    spec = importlib.util.spec_from_file_location(module_name, file_path)
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-                    # attempt to parse source to find return variable names or dict keys
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            src = f.read()
-                        import ast
-                        tree = ast.parse(src)
-                        func_returns = {}
-                        for node in tree.body:
-                            if isinstance(node, ast.FunctionDef):
-                                ret_names = []
-                                for st in ast.walk(node):
-                                    if isinstance(st, ast.Return) and st.value is not None:
-                                        v = st.value
-                                        # return of a simple name: return sum
-                                        if isinstance(v, ast.Name):
-                                            ret_names.append(v.id)
-                                        # return of a dict literal: return {'k': val}
-                                        elif isinstance(v, ast.Dict):
-                                            for key in v.keys:
-                                                if isinstance(key, ast.Constant):
-                                                    ret_names.append(str(key.value))
-                                if ret_names:
-                                    func_returns[node.name] = list(dict.fromkeys(ret_names))
-                        if func_returns:
-                            self.func_return_names[module_name] = func_returns
-                    except Exception:
-                        # ignore parsing errors
-                        pass
 
-                    # 获取模块中的函数
-                    functions = []
-                    for name in dir(module):
-                        if callable(getattr(module, name)) and not name.startswith("_"):
-                            functions.append(name)
-                            # 保存函数引用
-                            if module_name not in self.test_functions:
-                                self.test_functions[module_name] = {}
-                            self.test_functions[module_name][name] = getattr(module, name)
-
-                    # 添加到函数树
-                    if functions:
-                        module_item = QTreeWidgetItem([module_name])
-                        self.function_tree.addTopLevelItem(module_item)
-                        for func_name in functions:
-                            func_item = QTreeWidgetItem([func_name])
-                            module_item.addChild(func_item)
+        # 批量重建函数树期间暂停重绘和信号，结束后统一刷新一次；
+        # 放在 try/finally 中，扫描目录出错时函数树也不会停留在禁止刷新的状态
+        self.function_tree.setUpdatesEnabled(False)
+        self.function_tree.blockSignals(True)
+        try:
+            self.function_tree.clear()
+            top_items = []
+            for file_path, mtime_ns in _find_test_files(self.test_dir()):
+                try:
+                    # 文件未修改时命中 _load_test_module 的缓存，避免重复读取/编译/执行
+                    loaded = _load_test_module(file_path, mtime_ns)
                 except Exception as e:
-                    print(f"无法加载模块 {module_name}: {e}")
-        
-        self.function_tree.expandAll()
-
-        # 添加流程控制分类（可拖拽到序列中作为控制节点）
+                    log.warning("无法加载模块 %s: %s", file_path, e)
+                    continue
+                module_item = self.register_test_module(*loaded)
+                if module_item is not None:
+                    top_items.append(module_item)
+
+            # 添加流程控制分类（可拖拽到序列中作为控制节点）
+            control_item = self.make_control_category()
+            top_items.append(control_item)
+
+            self.function_tree.addTopLevelItems(top_items)
+            # 模块默认折叠，只展开前几个，避免一次性布局所有函数项
+            for i in range(min(3, len(top_items) - 1)):
+                top_items[i].setExpanded(True)
+            control_item.setExpanded(True)
+        finally:
+            self.function_tree.blockSignals(False)
+            self.function_tree.setUpdatesEnabled(True)
+
+        self.rebind_step_functions()
+
+    def test_dir(self):
+        """查找 Testcase/ 目录（优先），否则回退到当前目录"""
+        return os.path.join(os.getcwd(), 'Testcase') if os.path.isdir(os.path.join(os.getcwd(), 'Testcase')) else os.getcwd()
+
+    def make_control_category(self):
+        """Build the "流程控制" tree item holding the draggable control tokens."""
         control_item = QTreeWidgetItem(["流程控制"])
-        for ctrl in ["if", "for", "end", "break"]:
-            child = QTreeWidgetItem([ctrl])
-            control_item.addChild(child)
+        control_item.addChildren([QTreeWidgetItem([ctrl]) for ctrl in ["if", "for", "end", "break"]])
+        return control_item
+
+    def register_test_module(self, module_name, functions, func_returns):
+        """Record a loaded test module and build its function tree item.
+
+        Args:
+            module_name, functions, func_returns: result of _load_test_module
+
+        Returns:
+            QTreeWidgetItem for the module, or None if it has no test functions.
+        """
+        if func_returns:
+            self.func_return_names[module_name] = func_returns
+        # 保存函数引用，key: (模块名, 函数名)
+        for name, func in functions.items():
+            self.test_functions[(module_name, name)] = func
+            # 加载时解析一次签名，选中/执行步骤时直接查表
+            sig = inspect.signature(func)
+            sig_params = list(sig.parameters.items())
+            converters = [(param_name, _converter_for(param.annotation)) for param_name, param in sig_params]
+            self.signature_cache[(module_name, name)] = (sig, sig_params, sig.return_annotation, converters)
+
+        if not functions:
+            return None
+        module_item = QTreeWidgetItem([module_name])
+        module_item.addChildren([QTreeWidgetItem([func_name]) for func_name in functions])
+        return module_item
+
+    def rebind_step_functions(self):
+        """Rebind the callables held by existing steps to the currently loaded functions."""
+        for i in range(self.sequence_list.count()):
+            data = self.sequence_list.item(i).data(Qt.ItemDataRole.UserRole)
+            if data.type == 'function':
+                data.func = self.test_functions.get((data.module, data.function))
+
+    def start_load_worker(self):
+        """Load the test modules in a worker thread so the window shows before they are imported.
+
+        The tree starts with only the flow-control category; each module is
+        inserted above it as soon as the worker has imported it.
+        """
+        self.function_tree.clear()
+        self.test_functions.clear()
+        self.signature_cache.clear()
+        self.func_return_names = {}
+        control_item = self.make_control_category()
         self.function_tree.addTopLevelItem(control_item)
-        self.function_tree.expandItem(control_item)
-        
+        control_item.setExpanded(True)
+
+        loader = ModuleLoader(_find_test_files(self.test_dir()))
+        thread = QThread(self)
+        loader.moveToThread(thread)
+        thread.started.connect(loader.run)
+        loader.moduleLoaded.connect(self.on_module_loaded)
+        loader.loadFailed.connect(self.on_module_load_failed)
+        loader.finished.connect(thread.quit)
+        thread.finished.connect(self.on_load_finished)
+
+        self._loader = loader
+        self._load_thread = thread
+        self.load_button.setEnabled(False)
+        thread.start()
+
+    @pyqtSlot(str, object, object)
+    def on_module_loaded(self, module_name, functions, func_returns):
+        module_item = self.register_test_module(module_name, functions, func_returns)
+        if module_item is None:
+            return
+        # keep the flow-control category last
+        index = self.function_tree.topLevelItemCount() - 1
+        self.function_tree.insertTopLevelItem(index, module_item)
+        if index < 3:
+            module_item.setExpanded(True)
+
+    @pyqtSlot(str, str)
+    def on_module_load_failed(self, file_path, error):
+        log.warning("无法加载模块 %s: %s", file_path, error)
+
+    @pyqtSlot()
+    def on_load_finished(self):
+        """Release the finished loader/thread and re-enable reloading."""
+        self._load_thread.deleteLater()
+        self._loader = None
+        self._load_thread = None
+        # 序列仍在运行时由 on_run_finished 恢复加载按钮
+        self.load_button.setEnabled(self._runner is None)
+        self.rebind_step_functions()
+
+    @pyqtSlot()
     def clear_sequence(self):
         """清空测试序列"""
+        if self._runner is not None:
+            # 后台线程仍在写入步骤输出
+            return
         # first clear stored params/outputs on each step object
         for i in range(self.sequence_list.count()):
             it = self.sequence_list.item(i)
             data = it.data(Qt.ItemDataRole.UserRole)
-            if isinstance(data, StepObject):
-                data.params.clear()
-                data.outputs.clear()
+            data.params.clear()
+            data.outputs.clear()
 
-        # clear the visual list and caches
+        # clear the visual list
         self.sequence_list.clear()
-        self.step_params_cache.clear()
         # reset execution state and clear any markers
         self.exec_state = None
         try:
@@ -580,15 +1149,25 @@ class MainWindow(QMainWindow):
         self.update_watcher({})
         self.output_text.clear()
         
+    @pyqtSlot()
     def update_output(self):
-        """更新输出显示"""
-        sequence_text = "当前测试序列:\n"
-        for i in range(self.sequence_list.count()):
-            item = self.sequence_list.item(i)
+        """更新输出显示
+
+        若自上次刷新后只是在末尾新增了一项，且输出区内容仍是上次生成的序列列表，
+        则只追加新的一行；否则整体重建列表。
+        """
+        count = self.sequence_list.count()
+        doc = self.output_text.document()
+        if count == self._last_count + 1 and doc.revision() == self._listing_revision:
+            base = self.sequence_list.item(count - 1).text().split('  ')[0]
+            self.output_text.appendPlainText(f"{count}. {base}")
+        else:
+            lines = ["当前测试序列:"]
             # item.text() may include an exec marker; strip any marker suffix before building the output
-            base = item.text().split('  ')[0]
-            sequence_text += f"{i+1}. {base}\n"
-        self.output_text.setText(sequence_text)
+            lines.extend(f"{i+1}. {self.sequence_list.item(i).text().split('  ')[0]}" for i in range(count))
+            self.output_text.setPlainText("\n".join(lines))
+        self._last_count = count
+        self._listing_revision = doc.revision()
         # refresh visible numbering and exec marker
         try:
             idx = None
@@ -603,17 +1182,7 @@ class MainWindow(QMainWindow):
 
     # Executor helpers and state for step execution
     def _safe_eval(self, expr, local_vars=None):
-        if local_vars is None:
-            local_vars = {}
-        try:
-            import ast
-            return ast.literal_eval(expr)
-        except Exception:
-            try:
-                safe_globals = {"__builtins__": None, 'True': True, 'False': False, 'None': None}
-                return eval(expr, safe_globals, local_vars)
-            except Exception:
-                return False
+        return _safe_eval(expr, local_vars)
 
     def _run_block(self, start_idx, end_idx, runtime_vars, max_actions=None):
         """Execute items from start_idx..end_idx. If max_actions is set, stop after that many actions (control evaluations or function calls).
@@ -627,20 +1196,14 @@ class MainWindow(QMainWindow):
             step_data = item.data(Qt.ItemDataRole.UserRole)
 
             # Determine control or function
-            if isinstance(step_data, StepObject):
-                if step_data.type == 'control':
-                    ctrl = step_data.control
-                else:
-                    ctrl = None
-            else:
-                ctrl = step_data.get('control') if isinstance(step_data, dict) else None
+            ctrl = step_data.control if step_data.type == 'control' else None
 
             if ctrl == 'if':
                 match = self.find_matching_end(i)
-                cond_raw = step_data.params.get('condition', '') if isinstance(step_data, StepObject) else self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get('condition', '')
+                cond_raw = step_data.params.get('condition', '')
                 cond_val = self.resolve_references(cond_raw, runtime_vars)
                 cond_bool = cond_val if isinstance(cond_val, bool) else self._safe_eval(str(cond_val), runtime_vars)
-                self.output_text.append(f"IF condition ({cond_raw}) -> {cond_bool}")
+                self.output_text.appendPlainText(f"IF condition ({cond_raw}) -> {cond_bool}")
                 self.update_watcher(runtime_vars)
                 actions += 1
                 if max_actions is not None and actions >= max_actions:
@@ -662,8 +1225,8 @@ class MainWindow(QMainWindow):
                     continue
             elif ctrl == 'for':
                 match = self.find_matching_end(i)
-                iterable_raw = step_data.params.get('iterable', '') if isinstance(step_data, StepObject) else self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get('iterable', '')
-                varname = step_data.params.get('var', '_loop') if isinstance(step_data, StepObject) else self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get('var', '_loop')
+                iterable_raw = step_data.params.get('iterable', '')
+                varname = step_data.params.get('var', '_loop')
                 iterable_val = self.resolve_references(iterable_raw, runtime_vars)
                 if isinstance(iterable_val, int):
                     iterator = range(iterable_val)
@@ -675,7 +1238,7 @@ class MainWindow(QMainWindow):
                     except Exception:
                         iterator = []
 
-                self.output_text.append(f"FOR over {iterable_raw} -> {list(iterator)}")
+                self.output_text.appendPlainText(f"FOR over {iterable_raw} -> {list(iterator)}")
                 self.update_watcher(runtime_vars)
                 actions += 1
                 if max_actions is not None and actions >= max_actions:
@@ -703,7 +1266,7 @@ class MainWindow(QMainWindow):
             elif ctrl == 'break':
                 # signal to the enclosing for-loop to stop
                 actions += 1
-                self.output_text.append("BREAK")
+                self.output_text.appendPlainText("BREAK")
                 self.update_watcher(runtime_vars)
                 # raise to inform the caller (the parent for-handler) to stop iterating
                 raise BreakLoop(actions=1, runtime_vars=runtime_vars)
@@ -712,87 +1275,60 @@ class MainWindow(QMainWindow):
                 continue
 
             # function step
-            if isinstance(step_data, StepObject):
-                if step_data.type == 'function':
-                    module_name = step_data.module
-                    func_name = step_data.function
-                    func = self.test_functions.get(module_name, {}).get(func_name)
-                else:
-                    func = None
-            else:
-                if isinstance(step_data, dict) and step_data.get('type') == 'function':
-                    module_name = step_data.get('module')
-                    func_name = step_data.get('function')
-                    func = self.test_functions.get(module_name, {}).get(func_name)
-                else:
-                    func = None
+            module_name = step_data.module
+            func_name = step_data.function
+            func = step_data.func
 
             if func is None:
-                self.output_text.append(f"跳过未知步骤或控制: {item.text()}")
+                self.output_text.appendPlainText(f"跳过未知步骤或控制: {item.text()}")
                 self.update_watcher(runtime_vars)
                 i += 1
                 continue
 
-            self.output_text.append(f"执行: {module_name}.{func_name}...")
+            self.output_text.appendPlainText(f"执行: {module_name}.{func_name}...")
             self.update_watcher(runtime_vars)
 
-            import inspect
-            sig = inspect.signature(func)
-            params = sig.parameters
             args = {}
 
-            for param_name in params.keys():
-                if isinstance(step_data, StepObject):
-                    raw = step_data.params.get(param_name, '')
-                else:
-                    raw = self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get(param_name, '')
+            for param_name, convert in self.signature_cache[(module_name, func_name)][3]:
+                raw = step_data.params.get(param_name, '')
                 resolved = self.resolve_references(raw, runtime_vars)
-                param_type = params[param_name].annotation
-                if param_type != inspect.Parameter.empty:
-                    try:
-                        if param_type == bool:
-                            value = bool(resolved) if isinstance(resolved, bool) else str(resolved).lower() in ('true', '1', 'yes', 'on')
-                        elif param_type in (int, float):
-                            value = param_type(resolved)
-                        else:
-                            value = resolved
-                    except Exception as e:
-                        self.output_text.append(f"参数 '{param_name}' 类型转换失败: {e}")
-                        value = resolved
-                else:
+                try:
+                    value = convert(resolved)
+                except Exception as e:
+                    self.output_text.appendPlainText(f"参数 '{param_name}' 类型转换失败: {e}")
                     value = resolved
                 args[param_name] = value
 
             try:
                 result = func(**args)
-                if isinstance(step_data, StepObject):
-                    if isinstance(result, dict):
-                        step_data.outputs.update(result)
-                    else:
-                        # store generic return and also map to any param name whose passed value equals the return
-                        step_data.outputs['return'] = result
-                        try:
-                            for pn, pv in args.items():
-                                # simple equality check to map common pattern where function returns an input value
-                                if pv == result:
-                                    step_data.outputs[pn] = result
-                                # also map any predicted return names (parsed from source) to the returned value
-                                preds = self.func_return_names.get(step_data.module, {}).get(step_data.function, [])
-                                for pred in preds:
-                                    if pred not in step_data.outputs:
-                                        step_data.outputs[pred] = result
-                        except Exception:
-                            # don't break execution on mapping issues
-                            pass
+                if isinstance(result, dict):
+                    step_data.outputs.update(result)
+                else:
+                    # store generic return and also map to any param name whose passed value equals the return
+                    step_data.outputs['return'] = result
+                    try:
+                        for pn, pv in args.items():
+                            # simple equality check to map common pattern where function returns an input value
+                            if pv == result:
+                                step_data.outputs[pn] = result
+                            # also map any predicted return names (parsed from source) to the returned value
+                            preds = self.func_return_names.get(step_data.module, {}).get(step_data.function, [])
+                            for pred in preds:
+                                if pred not in step_data.outputs:
+                                    step_data.outputs[pred] = result
+                    except Exception:
+                        # don't break execution on mapping issues
+                        pass
                 # determine success: None or truthy -> success
                 success = (result is None) or bool(result)
-                self.output_text.append(f"{'成功' if success else '失败'}")
+                self.output_text.appendPlainText(f"{'成功' if success else '失败'}")
                 try:
                     self.set_item_status(item, success)
                 except Exception:
                     pass
             except Exception as e:
-                self.output_text.append(f"错误: {str(e)}")
+                self.output_text.appendPlainText(f"错误: {str(e)}")
                 try:
                     self.set_item_status(item, False)
                 except Exception:
@@ -806,15 +1342,19 @@ class MainWindow(QMainWindow):
 
         return (i, runtime_vars, actions)
 
+    @pyqtSlot()
     def step_run(self):
         """Execute a single action (control evaluation or a function call)."""
+        if self._runner is not None:
+            # never call test functions on the GUI thread while the runner is calling them
+            return
         if not hasattr(self, 'exec_state') or self.exec_state is None:
             # initialize execution state with a loop stack for single-stepping through for-loops
             self.exec_state = {'index': 0, 'vars': {}, 'loop_stack': []}
         start = self.exec_state['index']
         end = self.sequence_list.count() - 1
         if start > end:
-            self.output_text.append("已到序列末尾；请重置执行以重新开始。")
+            self.output_text.appendPlainText("已到序列末尾；请重置执行以重新开始。")
             return
         # show marker at current position before executing
         self.mark_exec_index(start)
@@ -832,7 +1372,7 @@ class MainWindow(QMainWindow):
         # If the current item is a for-header and we're not already inside that for-loop,
         # initialize loop state and set the first loop variable value so the next step
         # will execute the inner block with the loop var present.
-        if isinstance(step_data, StepObject) and step_data.type == 'control' and step_data.control == 'for':
+        if step_data.type == 'control' and step_data.control == 'for':
             # avoid double-initializing if we already have a loop stack entry for this start
             existing = None
             for e in self.exec_state.get('loop_stack', []):
@@ -860,7 +1400,7 @@ class MainWindow(QMainWindow):
                 # empty iterator: skip the whole for-block
                 ni = match + 1 if match != -1 else start + 1
                 self.exec_state['index'] = ni
-                self.output_text.append(f"单步执行: 空迭代对象，跳过 for-block，下一索引 {ni}")
+                self.output_text.appendPlainText(f"单步执行: 空迭代对象，跳过 for-block，下一索引 {ni}")
                 if self.exec_state['index'] <= end:
                     self.mark_exec_index(self.exec_state['index'])
                 else:
@@ -881,7 +1421,7 @@ class MainWindow(QMainWindow):
             self.exec_state['index'] = start + 1 if match != -1 else start + 1
             # update UI
             self.mark_exec_index(self.exec_state['index'])
-            self.output_text.append(f"进入 for: 设 {varname} = {entry['iterator'][entry['pos']]}，下一索引 {self.exec_state['index']}")
+            self.output_text.appendPlainText(f"进入 for: 设 {varname} = {entry['iterator'][entry['pos']]}，下一索引 {self.exec_state['index']}")
             return
 
         # If we're inside a loop body, run one action within that loop and handle iteration bookkeeping
@@ -908,7 +1448,7 @@ class MainWindow(QMainWindow):
                     self.mark_exec_index(self.exec_state['index'])
                 else:
                     self.mark_exec_index(None)
-                self.output_text.append(f"在循环内遇到 break，跳至索引 {ni}")
+                self.output_text.appendPlainText(f"在循环内遇到 break，跳至索引 {ni}")
                 return
 
             # update runtime vars
@@ -922,7 +1462,7 @@ class MainWindow(QMainWindow):
                     self.exec_state['vars'][enclosing['var']] = enclosing['iterator'][enclosing['pos']]
                     self.exec_state['index'] = enclosing['start'] + 1
                     self.mark_exec_index(self.exec_state['index'])
-                    self.output_text.append(f"循环下次迭代: 设 {enclosing['var']} = {enclosing['iterator'][enclosing['pos']]}，下一索引 {self.exec_state['index']}")
+                    self.output_text.appendPlainText(f"循环下次迭代: 设 {enclosing['var']} = {enclosing['iterator'][enclosing['pos']]}，下一索引 {self.exec_state['index']}")
                     return
                 else:
                     # loop fully completed: pop and resume after end
@@ -935,7 +1475,7 @@ class MainWindow(QMainWindow):
                         self.mark_exec_index(self.exec_state['index'])
                     else:
                         self.mark_exec_index(None)
-                    self.output_text.append(f"循环完成，下一索引 {self.exec_state['index']}")
+                    self.output_text.appendPlainText(f"循环完成，下一索引 {self.exec_state['index']}")
                     return
             else:
                 # still inside inner block; resume at returned index
@@ -944,7 +1484,7 @@ class MainWindow(QMainWindow):
                     self.mark_exec_index(self.exec_state['index'])
                 else:
                     self.mark_exec_index(None)
-                self.output_text.append(f"单步执行: 完成 {a} 个操作，下一索引 {ni}")
+                self.output_text.appendPlainText(f"单步执行: 完成 {a} 个操作，下一索引 {ni}")
                 return
 
         # default: not a for header nor inside a loop - just execute one action normally
@@ -965,8 +1505,9 @@ class MainWindow(QMainWindow):
             self.mark_exec_index(self.exec_state['index'])
         else:
             self.mark_exec_index(None)
-        self.output_text.append(f"单步执行: 完成 {a} 个操作，下一索引 {ni}")
+        self.output_text.appendPlainText(f"单步执行: 完成 {a} 个操作，下一索引 {ni}")
 
+    @pyqtSlot()
     def reset_executor(self):
         """Reset execution state and clear runtime variables and per-step outputs.
 
@@ -976,6 +1517,9 @@ class MainWindow(QMainWindow):
           - any global_vars stored on the window
         It does NOT clear step parameter values (用户输入的参数仍保留)。
         """
+        if self._runner is not None:
+            # the runner is still writing step outputs
+            return
         # reset exec state (include loop_stack for single-step loop handling)
         self.exec_state = {'index': 0, 'vars': {}, 'loop_stack': []}
 
@@ -983,16 +1527,15 @@ class MainWindow(QMainWindow):
         for i in range(self.sequence_list.count()):
             it = self.sequence_list.item(i)
             data = it.data(Qt.ItemDataRole.UserRole)
-            if isinstance(data, StepObject):
+            try:
+                data.outputs.clear()
+                # clear any status icon
                 try:
-                    data.outputs.clear()
-                    # clear any status icon
-                    try:
-                        it.setIcon(QIcon())
-                    except Exception:
-                        pass
+                    it.setIcon(QIcon())
                 except Exception:
                     pass
+            except Exception:
+                pass
 
         # clear global runtime variables if present
         try:
@@ -1003,8 +1546,9 @@ class MainWindow(QMainWindow):
         # refresh watcher and execution marker
         self.update_watcher({})
         self.mark_exec_index(self.exec_state['index'])
-        self.output_text.append("执行状态已重置；已清除运行时变量与步骤输出")
+        self.output_text.appendPlainText("执行状态已重置；已清除运行时变量与步骤输出")
 
+    @pyqtSlot(dict)
     def update_watcher(self, runtime_vars):
         """Refresh the watcher tree showing variables organized by sequence steps."""
         self.watcher_tree.clear()
@@ -1013,22 +1557,19 @@ class MainWindow(QMainWindow):
         for i in range(self.sequence_list.count()):
             it = self.sequence_list.item(i)
             data = it.data(Qt.ItemDataRole.UserRole)
-            
-            if not isinstance(data, StepObject):
-                continue
-                
+
             # Create a top-level node for this step
             step_node = QTreeWidgetItem([f"步骤 {i+1}: {it.text()}"])
             
             if data.type == 'function':
                 # Function steps show both inputs and outputs
                 inputs_node = QTreeWidgetItem(["输入参数"])
-                for k, v in data.params.items():
+                for k, v in list(data.params.items()):
                     inputs_node.addChild(QTreeWidgetItem([f"{k}: {v}"]))
                 step_node.addChild(inputs_node)
                 
                 outputs_node = QTreeWidgetItem(["输出结果"])
-                for k, v in data.outputs.items():
+                for k, v in list(data.outputs.items()):
                     outputs_node.addChild(QTreeWidgetItem([f"{k}: {v}"]))
                 step_node.addChild(outputs_node)
                 
@@ -1075,276 +1616,178 @@ class MainWindow(QMainWindow):
         for i in range(self.sequence_list.count()):
             item = self.sequence_list.item(i)
             data = item.data(Qt.ItemDataRole.UserRole)
-            # compute base label from StepObject when possible to avoid accumulating arrows
-            if isinstance(data, StepObject):
-                if data.type == 'function':
-                    base = f"{data.module}.{data.function}"
-                else:
-                    base = data.control
+            # compute base label from StepObject to avoid accumulating arrows
+            if data.type == 'function':
+                base = f"{data.module}.{data.function}"
             else:
-                # fallback: strip any previous arrow suffix
-                base = item.text().split('  ')[0]
+                base = data.control
 
             display = f"{i+1}. {base}"
             if idx is not None and i == idx:
                 display = f"{display}  <-"
-            item.setText(display)
+            # 文本未变化时不调用 setText，避免无谓的 dataChanged 和重新布局
+            if item.text() != display:
+                item.setText(display)
         
+    @pyqtSlot()
     def run_sequence(self):
-        """运行测试序列"""
-        output = "开始执行测试序列...\n"
-        self.output_text.setText(output)
-        QApplication.processEvents()  # 更新界面
-
-        def safe_eval(expr, local_vars=None):
-            if local_vars is None:
-                local_vars = {}
-            try:
-                import ast
-                return ast.literal_eval(expr)
-            except Exception:
-                try:
-                    safe_globals = {"__builtins__": None, 'True': True, 'False': False, 'None': None}
-                    return eval(expr, safe_globals, local_vars)
-                except Exception:
-                    return False
-
-        def run_block(start_idx, end_idx, runtime_vars):
-            """Execute items from start_idx to end_idx inclusive using runtime_vars for ${@var} replacements."""
-            nonlocal output
-            # update watcher at the start of block
-            try:
-                self.update_watcher(runtime_vars)
-            except Exception:
-                pass
-            i = start_idx
-            while i <= end_idx:
-                item = self.sequence_list.item(i)
-                step_data = item.data(Qt.ItemDataRole.UserRole)
-
-                # Determine control or function
-                if isinstance(step_data, StepObject):
-                    if step_data.type == 'control':
-                        ctrl = step_data.control
-                    else:
-                        ctrl = None
-                else:
-                    ctrl = step_data.get('control') if isinstance(step_data, dict) else None
-
-                if ctrl == 'if':
-                    # find matching end
-                    match = self.find_matching_end(i)
-                    cond_raw = step_data.params.get('condition', '') if isinstance(step_data, StepObject) else self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get('condition', '')
-                    cond_val = self.resolve_references(cond_raw, runtime_vars)
-                    # evaluate boolean
-                    cond_bool = cond_val if isinstance(cond_val, bool) else safe_eval(str(cond_val), runtime_vars)
-                    output += f"IF condition ({cond_raw}) -> {cond_bool}\n"
-                    self.output_text.setText(output)
-                    # update watcher after evaluating condition
-                    try:
-                        self.update_watcher(runtime_vars)
-                    except Exception:
-                        pass
-                    QApplication.processEvents()
-                    if cond_bool:
-                        # execute block inside
-                        if match != -1 and match > i:
-                            run_block(i+1, match-1, runtime_vars)
-                            i = match + 1
-                            continue
-                        else:
-                            i += 1
-                            continue
-                    else:
-                        # skip to end
-                        i = match + 1 if match != -1 else i + 1
-                        continue
-                elif ctrl == 'for':
-                    match = self.find_matching_end(i)
-                    iterable_raw = step_data.params.get('iterable', '') if isinstance(step_data, StepObject) else self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get('iterable', '')
-                    varname = step_data.params.get('var', '_loop') if isinstance(step_data, StepObject) else self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get('var', '_loop')
-                    iterable_val = self.resolve_references(iterable_raw, runtime_vars)
-                    # normalize iterable
-                    if isinstance(iterable_val, int):
-                        iterator = range(iterable_val)
-                    elif isinstance(iterable_val, (list, tuple)):
-                        iterator = iterable_val
-                    else:
-                        # try to eval as python expression
-                        try:
-                            iterator = list(safe_eval(str(iterable_val), runtime_vars))
-                        except Exception:
-                            iterator = []
-
-                    output += f"FOR over {iterable_raw} -> {list(iterator)}\n"
-                    self.output_text.setText(output)
-                    # update watcher after preparing iterator
-                    try:
-                        self.update_watcher(runtime_vars)
-                    except Exception:
-                        pass
-                    QApplication.processEvents()
-                    if match != -1 and match > i:
-                        for val in iterator:
-                            new_vars = dict(runtime_vars)
-                            new_vars[varname] = val
-                            try:
-                                run_block(i+1, match-1, new_vars)
-                            except BreakLoop:
-                                # break out of the iterator loop and continue after the matching end
-                                break
-                        i = match + 1
-                        continue
-                    else:
-                        i += 1
-                        continue
-                elif ctrl == 'break':
-                    # break encountered during full run: stop the innermost for loop
-                    output += "BREAK\n"
-                    self.output_text.setText(output)
-                    try:
-                        self.update_watcher(runtime_vars)
-                    except Exception:
-                        pass
-                    QApplication.processEvents()
-                    # raise to inform caller to break the iterator
-                    raise BreakLoop(actions=1, runtime_vars=runtime_vars)
-                elif ctrl == 'end':
-                    # should be handled by find_matching_end logic; just advance
-                    i += 1
-                    continue
-
-                # else, it's a function step
-                # prepare and call function
-                if isinstance(step_data, StepObject):
-                    if step_data.type == 'function':
-                        module_name = step_data.module
-                        func_name = step_data.function
-                        func = self.test_functions.get(module_name, {}).get(func_name)
-                    else:
-                        func = None
-                else:
-                    if isinstance(step_data, dict) and step_data.get('type') == 'function':
-                        module_name = step_data.get('module')
-                        func_name = step_data.get('function')
-                        func = self.test_functions.get(module_name, {}).get(func_name)
-                    else:
-                        func = None
-
-                if func is None:
-                    output += f"跳过未知步骤或控制: {item.text()}\n"
-                    self.output_text.setText(output)
-                    try:
-                        self.update_watcher(runtime_vars)
-                    except Exception:
-                        pass
-                    QApplication.processEvents()
-                    i += 1
-                    continue
-
-                output += f"执行: {module_name}.{func_name}... "
-                self.output_text.setText(output)
-                QApplication.processEvents()
-
-                import inspect
-                sig = inspect.signature(func)
-                params = sig.parameters
-                args = {}
-
-                for param_name in params.keys():
-                    # get raw value string from step params or current widgets
-                    if isinstance(step_data, StepObject):
-                        raw = step_data.params.get(param_name, '')
-                    else:
-                        raw = self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get(param_name, '')
-
-                    # resolve references
-                    resolved = self.resolve_references(raw, runtime_vars)
-
-                    # type conversion
-                    param_type = params[param_name].annotation
-                    if param_type != inspect.Parameter.empty:
-                        try:
-                            if param_type == bool:
-                                value = bool(resolved) if isinstance(resolved, bool) else str(resolved).lower() in ('true', '1', 'yes', 'on')
-                            elif param_type in (int, float):
-                                value = param_type(resolved)
-                            else:
-                                value = resolved
-                        except Exception as e:
-                            output += f"参数 '{param_name}' 类型转换失败: {e}\n"
-                            self.output_text.setText(output)
-                            QApplication.processEvents()
-                            value = resolved
-                    else:
-                        value = resolved
-                    args[param_name] = value
-
-                try:
-                    result = func(**args)
-                    # store outputs
-                    if isinstance(step_data, StepObject):
-                        if isinstance(result, dict):
-                            step_data.outputs.update(result)
-                        else:
-                            step_data.outputs['return'] = result
-                            try:
-                                for pn, pv in args.items():
-                                    if pv == result:
-                                        step_data.outputs[pn] = result
-                                # also map any predicted return names (parsed from source) to the returned value
-                                preds = self.func_return_names.get(module_name, {}).get(func_name, [])
-                                for pred in preds:
-                                    if pred not in step_data.outputs:
-                                        step_data.outputs[pred] = result
-                            except Exception:
-                                pass
-                    # determine success and set icon
-                    success = (result is None) or bool(result)
-                    output += f"{'成功' if success else '失败'}\n"
-                    try:
-                        self.set_item_status(item, success)
-                    except Exception:
-                        pass
-                except Exception as e:
-                    output += f"错误: {str(e)}\n"
-                    try:
-                        self.set_item_status(item, False)
-                    except Exception:
-                        pass
-
-                self.output_text.setText(output)
-                # update watcher after executing a function step
-                try:
-                    self.update_watcher(runtime_vars)
-                except Exception:
-                    pass
-                QApplication.processEvents()
-                i += 1
+        """运行测试序列
 
+        在后台线程中执行序列快照，输出、步骤状态和运行时变量通过信号回传到界面线程。
+        """
+        if self._runner is not None:
+            return
+        self.output_text.clear()
+        self.output_text.appendPlainText("开始执行测试序列...")
+
+        runner = SequenceRunner(self._build_plan())
+        runner.progress.connect(self.queue_output)
+        runner.step_finished.connect(self.on_runner_step_finished)
+        runner.vars_changed.connect(self.update_watcher)
+        runner.finished.connect(self.on_run_finished)
+
+        self._runner = runner
+        self.set_run_controls_enabled(False)
+        # 复用全局线程池中的线程，不必每次运行都创建/销毁 QThread
+        QThreadPool.globalInstance().start(runner.run)
+
+    def _build_plan(self):
+        """Compile the sequence list into plain tuples for SequenceRunner.
+
+        Runs on the GUI thread so the worker never touches a QListWidgetItem.
+        Each entry is (op, step_data, params, func, name, preds, arg_specs):
+          op        -> one of OP_CALL / OP_IF / OP_FOR / OP_BREAK / OP_END / OP_SKIP
+          params    -> snapshot of the step's parameter values
+          func      -> resolved callable for OP_CALL, else None
+          name      -> "module.function" for OP_CALL, the item text for OP_SKIP
+          preds     -> return names parsed from the function source
+          arg_specs -> (param_name, converter, value, deferred) per argument; values
+                       without references are resolved and converted here, the
+                       rest (deferred=True) are left raw for the runner
+        """
+        plan = []
+        for i in range(self.sequence_list.count()):
+            item = self.sequence_list.item(i)
+            step_data = item.data(Qt.ItemDataRole.UserRole)
+            params = dict(step_data.params)
+            ctrl = step_data.control if step_data.type == 'control' else None
+            module_name, func_name = step_data.module, step_data.function
+            func = step_data.func
+
+            op = CONTROL_OPS.get(ctrl)
+            if op is not None:
+                plan.append((op, step_data, params, None, ctrl, (), ()))
+                continue
+            cached_sig = self.signature_cache.get((module_name, func_name))
+            if func is None or cached_sig is None:
+                plan.append((OP_SKIP, step_data, params, None, item.text(), (), ()))
+            else:
+                preds = tuple(self.func_return_names.get(module_name, {}).get(func_name, []))
+                arg_specs = tuple(self._arg_spec(name, convert, params.get(name, ''))
+                                  for name, convert in cached_sig[3])
+                plan.append((OP_CALL, step_data, params, func, f"{module_name}.{func_name}", preds, arg_specs))
+        return plan
+
+    @staticmethod
+    def _arg_spec(param_name, convert, raw):
+        """Pre-convert one argument for the run plan, see _build_plan."""
+        if isinstance(raw, str) and '${' in raw:
+            return (param_name, convert, raw, True)
+        # no references: the value is the same for every iteration, convert it once
+        resolved = _resolve_references(raw, None, None)
         try:
-            run_block(0, self.sequence_list.count()-1, {})
-            output += "测试序列执行完成。\n"
-            self.output_text.setText(output)
-        except BreakLoop:
-            # break outside of any for-block: ignore and finish run
-            output += "遇到 break（未在循环内），已忽略。\n"
-            self.output_text.setText(output)
-        except Exception as e:
-            output += f"执行过程中发生错误: {str(e)}\n"
-            self.output_text.setText(output)
+            value = convert(resolved)
+        except Exception:
+            # leave failures to the runner so the error is reported in the run output
+            return (param_name, convert, raw, True)
+        if not isinstance(value, _SHARED_ARG_TYPES):
+            # containers (even tuples holding lists) may be mutated by a called function;
+            # build a fresh value per call as before
+            return (param_name, convert, raw, True)
+        return (param_name, convert, value, False)
+
+    @pyqtSlot(str)
+    def queue_output(self, line):
+        """Buffer a runner output line; buffered lines are written together by flush_output."""
+        self._pending_output.append(line)
+        if not self._output_flush_timer.isActive():
+            self._output_flush_timer.start()
+
+    @pyqtSlot()
+    def flush_output(self):
+        """Append all buffered runner output to the output pane in one edit."""
+        if self._pending_output:
+            self.output_text.appendPlainText("\n".join(self._pending_output))
+            self._pending_output.clear()
+
+    @pyqtSlot(int, bool)
+    def on_runner_step_finished(self, index, success):
+        """Mark PASS/FAIL on the item the runner just executed, if it is still at that row."""
+        item = self.sequence_list.item(index)
+        if item is not None and self._runner is not None \
+                and item.data(Qt.ItemDataRole.UserRole) is self._runner.plan[index][1]:
+            self.set_item_status(item, success)
+
+    @pyqtSlot()
+    def on_run_finished(self):
+        """Release the finished runner and re-enable the run controls."""
+        self.flush_output()
+        self._runner = None
+        self.set_run_controls_enabled(True)
+        if self._close_pending:
+            # 窗口已隐藏，关闭它不会触发 lastWindowClosed，需要显式退出事件循环
+            self.close()
+            QApplication.quit()
+
+    def set_run_controls_enabled(self, enabled):
+        """Enable/disable the buttons that must not be used while the sequence runs in the worker."""
+        for button in (self.run_button, self.step_button, self.reset_exec_button, self.clear_button):
+            button.setEnabled(enabled)
+        # 启动时的后台加载未结束时保持禁用，由 on_load_finished 恢复
+        self.load_button.setEnabled(enabled and self._load_thread is None)
+        self.sequence_list.locked = not enabled
+
+    def closeEvent(self, event):
+        if self._runner is not None:
+            # 不在界面线程上等待测试返回：取消后续步骤、先隐藏窗口，由 on_run_finished 再次关闭
+            self._runner.cancel()
+            self._close_pending = True
+            self.hide()
+            event.ignore()
+            return
+        # wait for running workers so their threads are not destroyed while running
+        QThreadPool.globalInstance().waitForDone()
+        if self._load_thread is not None:
+            self._load_thread.wait()
+        super().closeEvent(event)
 
     def add_input_row(self, param_name, default_value="", read_only=False):
-        """添加一行参数输入，并输出调试信息"""
-        print(f"[DEBUG] 创建输入框: {param_name} = '{default_value}'")
+        """添加一行参数输入（优先复用已隐藏的行控件），并输出调试信息"""
+        log.debug("创建输入框: %s = '%s'", param_name, default_value)
+        if self._active_rows < len(self._row_pool):
+            _, label, edit, ref_btn = self._row_pool[self._active_rows]
+            label.show()
+            edit.show()
+            ref_btn.show()
+        else:
+            _, label, edit, ref_btn = self._make_input_row()
+        self._active_rows += 1
+        label.setText(f"{param_name}:")
+        edit.setText(str(default_value))
+        edit.setReadOnly(read_only)
+        self.current_param_widgets[param_name] = edit
+        log.debug("QLineEdit.text() after set: '%s'", edit.text())
+        return edit
+
+    def _make_input_row(self):
+        """Create a pooled (layout, label, edit, ref_btn) input row and add it to the parameter area."""
         row_layout = QHBoxLayout()
         # remove spacing/margins so input rows sit flush together
         row_layout.setSpacing(0)
         row_layout.setContentsMargins(0, 0, 0, 0)
-        label = QLabel(f"{param_name}:")
+        label = QLabel()
         label.setFixedWidth(100)
-        edit = QLineEdit(str(default_value))
-        edit.setReadOnly(read_only)
+        edit = QLineEdit()
         row_layout.addWidget(label)
         row_layout.addWidget(edit)
 
@@ -1354,78 +1797,75 @@ class MainWindow(QMainWindow):
         ref_btn.setFixedWidth(48)
         row_layout.addWidget(ref_btn)
         self.input_params_layout.addLayout(row_layout)
-        self.current_param_widgets[param_name] = edit
-        print(f"[DEBUG] QLineEdit.text() after set: '{edit.text()}'")
-        edit.repaint()
-        edit.update()
-        # build and show the menu when ref_btn is clicked
-        def show_ref_menu():
-            """Show a flat reference menu listing each available step/key with the step index
-            so duplicate functions are unambiguous.
-            """
-            menu = QMenu(self)
-            has_any = False
-            # gather steps and add actions directly so each action clearly shows the step index
-            for i in range(self.sequence_list.count()):
-                it = self.sequence_list.item(i)
-                data = it.data(Qt.ItemDataRole.UserRole)
-                if not isinstance(data, StepObject):
-                    continue
-                title = it.text()
-                # collect candidate keys: outputs (prefer) then params
-                keys = []
-                for k in data.outputs.keys():
-                    keys.append((k, 'out'))
-                for k in data.params.keys():
-                    if k not in data.outputs:
-                        keys.append((k, 'param'))
-                if data.type == 'function':
-                    preds = self.func_return_names.get(data.module, {}).get(data.function, [])
-                    for k in preds:
-                        if not any(k == ex for ex, _ in keys):
-                            keys.append((k, 'pred'))
-
-                if not keys:
-                    continue
+        # the row's widgets never change, so they are wired once for the pool's lifetime
+        edit.textChanged.connect(self._on_any_param_changed)
+        ref_btn.clicked.connect(lambda checked=False: self.show_ref_menu(edit, ref_btn))
 
-                for key, kind in keys:
-                    # label includes step index and function/control title to avoid ambiguity
-                    suffix = ''
-                    if kind == 'out' or kind == 'pred':
-                        suffix = ' (out)'
-                    action_text = f"#{i+1} {title} :: {key}{suffix}"
-                    act = menu.addAction(action_text)
-                    if kind == 'pred':
-                        act.setToolTip('预测输出（未运行）：运行后会填充真实值')
-                    def make_handler(step_index, k):
-                        return lambda checked=False: edit.insert(f"${{{'#'}{step_index}:{k}}}")
-                    act.triggered.connect(make_handler(i+1, key))
-                    has_any = True
+        row = (row_layout, label, edit, ref_btn)
+        self._row_pool.append(row)
+        return row
 
-            if not has_any:
-                a = menu.addAction("无可用引用")
-                a.setEnabled(False)
+    def show_ref_menu(self, edit, ref_btn):
+        """Show a flat reference menu listing each available step/key with the step index
+        so duplicate functions are unambiguous.
+        """
+        menu = QMenu(self)
+        has_any = False
+        # gather steps and add actions directly so each action clearly shows the step index
+        for i in range(self.sequence_list.count()):
+            it = self.sequence_list.item(i)
+            data = it.data(Qt.ItemDataRole.UserRole)
+            title = it.text()
+            # collect candidate keys: outputs (prefer) then params
+            # 运行中后台线程可能正在更新 outputs，先取快照再遍历
+            out_keys = list(data.outputs)
+            keys = [(k, 'out') for k in out_keys]
+            for k in data.params.keys():
+                if k not in out_keys:
+                    keys.append((k, 'param'))
+            if data.type == 'function':
+                preds = self.func_return_names.get(data.module, {}).get(data.function, [])
+                for k in preds:
+                    if not any(k == ex for ex, _ in keys):
+                        keys.append((k, 'pred'))
 
-            menu.exec(ref_btn.mapToGlobal(ref_btn.rect().bottomLeft()))
+            if not keys:
+                continue
 
-        ref_btn.clicked.connect(show_ref_menu)
+            for key, kind in keys:
+                # label includes step index and function/control title to avoid ambiguity
+                suffix = ''
+                if kind == 'out' or kind == 'pred':
+                    suffix = ' (out)'
+                action_text = f"#{i+1} {title} :: {key}{suffix}"
+                act = menu.addAction(action_text)
+                if kind == 'pred':
+                    act.setToolTip('预测输出（未运行）：运行后会填充真实值')
+                def make_handler(step_index, k):
+                    return lambda checked=False: edit.insert(f"${{{'#'}{step_index}:{k}}}")
+                act.triggered.connect(make_handler(i+1, key))
+                has_any = True
+
+        if not has_any:
+            a = menu.addAction("无可用引用")
+            a.setEnabled(False)
+
+        menu.exec(ref_btn.mapToGlobal(ref_btn.rect().bottomLeft()))
 
-        return edit
-        
     def clear_param_inputs(self):
-        """清除所有参数输入框"""
-        while self.input_params_layout.count():
-            child = self.input_params_layout.takeAt(0)
-            if child.layout():
-                while child.layout().count():
-                    widget = child.layout().takeAt(0).widget()
-                    if widget:
-                        widget.deleteLater()
+        """隐藏所有参数输入行（控件保留在池中供下次复用）"""
+        for _, label, edit, ref_btn in self._row_pool[:self._active_rows]:
+            label.hide()
+            edit.hide()
+            ref_btn.hide()
+        self._active_rows = 0
+        # 解除绑定，复用这些行时的 setText 不会写回之前的步骤
+        self._edit_binding.clear()
         self.current_param_widgets.clear()  # 确保控件映射也被清除
         self.output_params_label.setText("-")
 
     def save_current_params(self, item=None):
-        """保存指定 item（或当前项）的参数到缓存。
+        """把参数输入框的值保存到指定 item（或当前项）的 StepObject.params。
 
         Args:
             item (QListWidgetItem|None): 要保存的项；为 None 时使用当前项。
@@ -1434,32 +1874,22 @@ class MainWindow(QMainWindow):
         if not current_item or not self.current_param_widgets:
             return
 
-        # 获取item的唯一ID
-        item_id = current_item.data(Qt.ItemDataRole.UserRole + 1)
-        if not item_id:
-            return
-
-        if item_id not in self.step_params_cache:
-            self.step_params_cache[item_id] = {}
-
-        # 如果 item 使用 StepObject，则把值保存到该对象的 params；否则回退到旧的 step_params_cache
         data = current_item.data(Qt.ItemDataRole.UserRole)
-        if isinstance(data, StepObject):
-            for param_name, widget in self.current_param_widgets.items():
-                data.params[param_name] = widget.text()
-        else:
-            if item_id not in self.step_params_cache:
-                self.step_params_cache[item_id] = {}
-            for param_name, widget in self.current_param_widgets.items():
-                self.step_params_cache[item_id][param_name] = widget.text()
+        for param_name, widget in self.current_param_widgets.items():
+            data.params[param_name] = widget.text()
+
+    @pyqtSlot(str)
+    def _on_any_param_changed(self, text):
+        """Shared textChanged slot of all pooled parameter edits; dispatches on sender()."""
+        binding = self._edit_binding.get(self.sender())
+        if binding is not None:
+            self.on_param_changed(binding[0], binding[1], text)
 
     def on_param_changed(self, item, param_name, value):
         """Callback when a parameter input changes — update the StepObject for the given item."""
         if not item:
             return
-        data = item.data(Qt.ItemDataRole.UserRole)
-        if isinstance(data, StepObject):
-            data.params[param_name] = value
+        item.data(Qt.ItemDataRole.UserRole).params[param_name] = value
 
     def resolve_references(self, text, runtime_vars=None):
         """Resolve reference patterns in text.
@@ -1473,45 +1903,17 @@ class MainWindow(QMainWindow):
         if runtime_vars is None:
             runtime_vars = {}
 
-        if not isinstance(text, str):
-            return text
-
-        import re
-
-        def repl_step(m):
-            idx = int(m.group(1)) - 1
-            key = m.group(2)
+        def step_value(idx, key):
             if 0 <= idx < self.sequence_list.count():
                 item = self.sequence_list.item(idx)
                 data = item.data(Qt.ItemDataRole.UserRole)
                 # prefer outputs then params
-                if isinstance(data, StepObject):
-                    if key in data.outputs:
-                        return str(data.outputs.get(key))
-                    return str(data.params.get(key, ""))
-                else:
-                    cache = self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {})
-                    return str(cache.get(key, ""))
+                if key in data.outputs:
+                    return str(data.outputs.get(key))
+                return str(data.params.get(key, ""))
             return ""
 
-        def repl_var(m):
-            name = m.group(1)
-            return str(runtime_vars.get(name, ""))
-
-        # replace ${#N:key}
-        text2 = re.sub(r"\$\{#(\d+):([^}]+)\}", repl_step, text)
-        # replace ${@var}
-        text3 = re.sub(r"\$\{@([^}]+)\}", repl_var, text2)
-
-        # Try to interpret as literal (number, list) if possible
-        try:
-            import ast
-            val = ast.literal_eval(text3)
-            return val
-        except Exception:
-            pass
-
-        return text3
+        return _resolve_references(text, step_value, runtime_vars)
 
     def find_matching_end(self, start_index):
         """Find the matching 'end' index for a control starting at start_index.
@@ -1523,11 +1925,7 @@ class MainWindow(QMainWindow):
         for i in range(start_index, self.sequence_list.count()):
             item = self.sequence_list.item(i)
             data = item.data(Qt.ItemDataRole.UserRole)
-            ctrl = None
-            if isinstance(data, StepObject) and data.type == "control":
-                ctrl = data.control
-            elif isinstance(data, dict) and data.get("type") == "control":
-                ctrl = data.get("control")
+            ctrl = data.control if data.type == "control" else None
 
             if ctrl in ("if", "for"):
                 depth += 1
@@ -1538,6 +1936,7 @@ class MainWindow(QMainWindow):
         return -1
 
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()